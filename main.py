@@ -2,11 +2,32 @@ from astrbot.api.star import Star, register, Context
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.event.filter import EventMessageType
 from astrbot.api import logger
+from astrbot.api.message_components import Plain, Image, Face, Reply, At
 from astrbot.core.utils.astrbot_path import get_astrbot_data_path
 import sqlite3, os
 from datetime import datetime, timedelta
 import asyncio
 import json
+import time
+
+# 内存缓冲写入数据库的间隔（秒）
+FLUSH_INTERVAL = 5
+# 消息类型计数字段，与缓冲计数列表中 msg_count 之后的顺序一致（关闭类型统计时列表只含 msg_count）
+TYPE_FIELDS = ("text_msgs", "image_msgs", "face_msgs", "reply_msgs", "at_msgs", "char_count")
+# 消息组件对应的计数下标，均由 TYPE_FIELDS 推出（下标 0 为 msg_count）
+COMPONENT_SLOTS = {
+    Plain: 1 + TYPE_FIELDS.index("text_msgs"),
+    Image: 1 + TYPE_FIELDS.index("image_msgs"),
+    Face: 1 + TYPE_FIELDS.index("face_msgs"),
+    Reply: 1 + TYPE_FIELDS.index("reply_msgs"),
+    At: 1 + TYPE_FIELDS.index("at_msgs"),
+}
+TEXT_SLOT = COMPONENT_SLOTS[Plain]
+CHAR_SLOT = 1 + TYPE_FIELDS.index("char_count")
+# 上周消息少于该值的群不做周环比下降告警，避免小群噪声
+HEALTH_MIN_WEEK_MSGS = 50
+# 计算健康度时同时拉取群成员列表的最大请求数
+HEALTH_MEMBER_FETCH_CONCURRENCY = 4
 
 @register("astrbot_plugin_group_stats", "user", "群聊活跃统计", "1.2.1", "https://github.com/zh-hlj/astrbot_plugin_group_stats")
 class GroupStatsPlugin(Star):
@@ -24,14 +45,57 @@ class GroupStatsPlugin(Star):
             with open(config_path, 'r', encoding='utf-8') as f:
                 self.config = json.load(f)
         else:
-            self.config = {"target_groups": [], "push_time": "09:00"}
+            self.config = {
+                "target_groups": [],
+                "push_time": "09:00",
+                "enable_type_breakdown": True,
+                "health_drop_threshold": 0.3,
+                "ingest_max_pending": 10000,
+                "ingest_sample_threshold": 200,
+                "ingest_sample_rate": 10,
+            }
             logger.warning(f"[{self.plugin_name}] Config file not found, using defaults.")
 
         self.target_groups = self.config.get("target_groups", [])
         self.push_time = self.config.get("push_time", "09:00")
+        # 取值范围与 WebAPI 的 _validate_config 保持一致
+        self.type_breakdown = bool(self.config.get("enable_type_breakdown", True))
+        self.health_drop_threshold = min(1.0, max(0.0, float(self.config.get("health_drop_threshold", 0.3))))
+        # 写入缓冲最多容纳的 (群, 用户) 条目数，超出后新用户的消息被丢弃并计数
+        self.max_pending = max(100, int(self.config.get("ingest_max_pending", 10000)))
+        # 单群在一个落库周期内超过该消息数后，类型统计改为按 1/sample_rate 抽样
+        self.sample_threshold = max(1, int(self.config.get("ingest_sample_threshold", 200)))
+        self.sample_rate = max(1, int(self.config.get("ingest_sample_rate", 10)))
+
+        # 当前记账日：只在 _rollover 中切换，所有读写都以它为准
+        self.active_day = datetime.now().strftime("%Y-%m-%d")
+        # 当日未落库的消息计数 {(group_id, user_id): [msg_count, *TYPE_FIELDS]}
+        self._pending = {}
+        # 当前落库周期内各群的消息数，用于判断是否进入抽样
+        self._group_window = {}
+        self._flush_task = None
+        self._dropped_reported = 0
+        self.ingest_stats = {
+            "received": 0,
+            "dropped": 0,
+            "sampled_out": 0,
+            "early_flushes": 0,
+            "peak_pending": 0,
+            "last_flush_ms": 0.0,
+        }
+        self._day_lock = asyncio.Lock()
+        # 写库失败的批次按日期暂存 {date: {(group_id, user_id): counts}}，下次落库时重试
+        self._retry = {}
+        # 已切走但尚未成功封存的日期
+        self._unsealed_days = set()
+        # 启动时的补封存、待计算健康度的日期、待发送的每日推送，失败后都由调度任务重试
+        self._backfill_due = True
+        self._health_due = self._prev_day(self.active_day)
+        self._push_due = False
+        self._last_push_date = None
 
         # 启动调度任务
-        asyncio.create_task(self.scheduler())
+        self._scheduler_task = asyncio.create_task(self.scheduler())
 
     def _init_db(self):
         with sqlite3.connect(self.db) as conn:
@@ -44,32 +108,539 @@ class GroupStatsPlugin(Star):
                     PRIMARY KEY (group_id, user_id, date)
                 )
             """)
+            # 已封存日期的群级汇总，封存后不再变动
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS daily_rollup(
+                    group_id INTEGER,
+                    date TEXT,
+                    active_users INTEGER DEFAULT 0,
+                    msg_count INTEGER DEFAULT 0,
+                    PRIMARY KEY (group_id, date)
+                )
+            """)
+            # 旧库补充消息类型计数列
+            for table in ("activity", "daily_rollup"):
+                columns = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+                for field in TYPE_FIELDS:
+                    if field not in columns:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {field} INTEGER DEFAULT 0")
+            # 按用户查询（含跨群）与群内当日排名用的索引
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_activity_user ON activity(user_id, group_id, date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_activity_group_date ON activity(group_id, date, msg_count)")
+            # 封存与补封存按日期扫描
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_activity_date ON activity(date)")
+            # 每个用户在每个群的增量计数：连续活跃天数与累计消息
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS user_streak(
+                    user_id INTEGER,
+                    group_id INTEGER,
+                    last_date TEXT,
+                    streak INTEGER DEFAULT 0,
+                    best_streak INTEGER DEFAULT 0,
+                    total_msgs INTEGER DEFAULT 0,
+                    PRIMARY KEY (user_id, group_id)
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS plugin_meta(key TEXT PRIMARY KEY, value TEXT)")
+            # 升级后首次启动时初始化；此时调度任务尚未创建，不会有批次先写入 user_streak
+            if not conn.execute("SELECT 1 FROM plugin_meta WHERE key='user_streak_seeded'").fetchone():
+                self._seed_user_streak(conn)
+            # 群健康度，按封存日计算一次
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS group_health(
+                    group_id INTEGER,
+                    date TEXT,
+                    avg_users_7d REAL,
+                    avg_users_30d REAL,
+                    avg_msgs_7d REAL,
+                    avg_msgs_30d REAL,
+                    member_count INTEGER,
+                    activity_rate REAL,
+                    wow_change REAL,
+                    drop_alert INTEGER DEFAULT 0,
+                    computed_at TEXT,
+                    PRIMARY KEY (group_id, date)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sealed_days(
+                    date TEXT PRIMARY KEY,
+                    sealed_at TEXT
+                )
+            """)
 
-    @filter.event_message_type(filter.EventMessageType.GROUP_MESSAGE)
-    async def on_group_msg(self, event: AstrMessageEvent):
-        gid = event.message_obj.group_id
-        uid = event.get_sender_id()
-        today = datetime.now().strftime("%Y-%m-%d")
+    @staticmethod
+    def _prev_day(day: str) -> str:
+        return (datetime.strptime(day, "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+
+    def _write_batch(self, day: str, pending: dict):
+        """把一批缓冲计数写入 day 对应的记录"""
+        if not pending:
+            return
+        rows = [(gid, uid, day, counts) for (gid, uid), counts in pending.items()]
         with sqlite3.connect(self.db) as conn:
-            conn.execute(
+            conn.executemany(
                 "INSERT OR IGNORE INTO activity(group_id,user_id,date,msg_count) VALUES (?,?,?,0)",
-                (gid, uid, today),
+                [r[:3] for r in rows],
+            )
+            # 带类型计数的条目与 msg_count 同一条语句写入；关闭类型统计时的条目只有 msg_count
+            updates = ",".join(f"{f}={f}+?" for f in TYPE_FIELDS)
+            typed = [(*counts, gid, uid, d) for gid, uid, d, counts in rows if len(counts) > 1]
+            plain = [(counts[0], gid, uid, d) for gid, uid, d, counts in rows if len(counts) == 1]
+            if typed:
+                conn.executemany(
+                    f"UPDATE activity SET msg_count=msg_count+?,{updates} WHERE group_id=? AND user_id=? AND date=?",
+                    typed,
+                )
+            if plain:
+                conn.executemany(
+                    "UPDATE activity SET msg_count=msg_count+? WHERE group_id=? AND user_id=? AND date=?",
+                    plain,
+                )
+            # 同一批次内更新连续天数：上次活跃是昨天则 +1，是今天则不变，否则重置为 1
+            prev_day = self._prev_day(day)
+            conn.executemany(
+                """
+                INSERT INTO user_streak(user_id,group_id,last_date,streak,best_streak,total_msgs)
+                VALUES (?,?,?,1,1,?)
+                ON CONFLICT(user_id,group_id) DO UPDATE SET
+                    streak = CASE WHEN last_date=excluded.last_date THEN streak
+                                  WHEN last_date=? THEN streak+1 ELSE 1 END,
+                    best_streak = MAX(best_streak, CASE WHEN last_date=excluded.last_date THEN streak
+                                                        WHEN last_date=? THEN streak+1 ELSE 1 END),
+                    total_msgs = total_msgs+excluded.total_msgs,
+                    last_date = excluded.last_date
+                """,
+                [(uid, gid, d, counts[0], prev_day, prev_day) for gid, uid, d, counts in rows],
+            )
+
+    def _seed_user_streak(self, conn):
+        """用历史记录重建 user_streak，并在同一事务内记下已完成"""
+        conn.execute("DELETE FROM user_streak")
+        # 连续日期的 julianday 与序号之差相同，据此切分连续段
+        conn.execute("""
+            INSERT INTO user_streak(user_id,group_id,last_date,streak,best_streak,total_msgs)
+            WITH days AS (
+                SELECT user_id, group_id, date, msg_count,
+                       julianday(date) - ROW_NUMBER() OVER (
+                           PARTITION BY user_id, group_id ORDER BY date) AS run
+                FROM activity
+            ), runs AS (
+                SELECT user_id, group_id, MAX(date) AS end_date,
+                       COUNT(*) AS len, SUM(msg_count) AS msgs
+                FROM days GROUP BY user_id, group_id, run
+            ), ranked AS (
+                SELECT user_id, group_id, end_date, len,
+                       MAX(len) OVER w AS best,
+                       SUM(msgs) OVER w AS total,
+                       ROW_NUMBER() OVER (PARTITION BY user_id, group_id ORDER BY end_date DESC) AS rn
+                FROM runs
+                WINDOW w AS (PARTITION BY user_id, group_id)
             )
+            SELECT user_id, group_id, end_date, len, best, total FROM ranked WHERE rn=1
+        """)
+        conn.execute("INSERT OR REPLACE INTO plugin_meta(key,value) VALUES ('user_streak_seeded', ?)",
+                     (datetime.now().isoformat(timespec="seconds"),))
+        logger.info(f"[{self.plugin_name}] Seeded user streaks from history.")
+
+    def _seal_days_before(self, day: str):
+        """一次性补封存 day 之前所有未封存的日期（停机或升级遗留）"""
+        with sqlite3.connect(self.db) as conn:
             conn.execute(
-                "UPDATE activity SET msg_count=msg_count+1 WHERE group_id=? AND user_id=? AND date=?",
-                (gid, uid, today),
+                f"INSERT OR REPLACE INTO daily_rollup(group_id,date,active_users,msg_count,{','.join(TYPE_FIELDS)}) "
+                f"SELECT group_id, date, COUNT(DISTINCT user_id), SUM(msg_count), "
+                f"{','.join(f'SUM({f})' for f in TYPE_FIELDS)} "
+                "FROM activity WHERE date<? AND date NOT IN (SELECT date FROM sealed_days) "
+                "GROUP BY group_id, date",
+                (day,),
+            )
+            cur = conn.execute(
+                "INSERT INTO sealed_days(date,sealed_at) "
+                "SELECT DISTINCT date, ? FROM activity WHERE date<? AND date NOT IN (SELECT date FROM sealed_days)",
+                (datetime.now().isoformat(timespec="seconds"), day),
+            )
+        if cur.rowcount:
+            logger.info(f"[{self.plugin_name}] Sealed {cur.rowcount} earlier days.")
+
+    def _seal_day(self, day: str):
+        """生成 day 的群级汇总并标记为已封存，重复调用不会重复计算"""
+        with sqlite3.connect(self.db) as conn:
+            if conn.execute("SELECT 1 FROM sealed_days WHERE date=?", (day,)).fetchone():
+                return
+            conn.execute(
+                f"INSERT OR REPLACE INTO daily_rollup(group_id,date,active_users,msg_count,{','.join(TYPE_FIELDS)}) "
+                f"SELECT group_id, date, COUNT(DISTINCT user_id), SUM(msg_count), "
+                f"{','.join(f'SUM({f})' for f in TYPE_FIELDS)} "
+                "FROM activity WHERE date=? GROUP BY group_id",
+                (day,),
+            )
+            conn.execute(
+                "INSERT INTO sealed_days(date,sealed_at) VALUES (?,?)",
+                (day, datetime.now().isoformat(timespec="seconds")),
+            )
+        logger.info(f"[{self.plugin_name}] Sealed day {day}.")
+
+    def _swap_pending(self) -> dict:
+        pending, self._pending = self._pending, {}
+        self._group_window = {}
+        stats = self.ingest_stats
+        stats["peak_pending"] = max(stats["peak_pending"], len(pending))
+        if stats["dropped"] > self._dropped_reported:
+            logger.warning(
+                f"[{self.plugin_name}] Ingest buffer full, dropped "
+                f"{stats['dropped'] - self._dropped_reported} messages."
             )
+            self._dropped_reported = stats["dropped"]
+        return pending
+
+    async def _write_batch_async(self, day: str, pending: dict):
+        # 在线程中写库，避免 SQLite 阻塞事件循环
+        start = time.perf_counter()
+        # shield：任务被取消时已取出的批次仍会写完
+        await asyncio.shield(asyncio.to_thread(self._write_batch, day, pending))
+        self.ingest_stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    def _merge_retry(self, day: str, pending: dict):
+        target = self._retry.setdefault(day, {})
+        for key, counts in pending.items():
+            existing = target.get(key)
+            if existing is None:
+                target[key] = counts
+                continue
+            if len(existing) < len(counts):
+                existing.extend([0] * (len(counts) - len(existing)))
+            for i, v in enumerate(counts):
+                existing[i] += v
+
+    async def _write_or_retry(self, day: str, pending: dict) -> bool:
+        """写入一个批次，失败时并入重试缓冲（批次在单个事务内写入，失败不会部分生效）"""
+        if not pending:
+            return True
+        try:
+            await self._write_batch_async(day, pending)
+            return True
+        except sqlite3.Error as e:
+            logger.warning(f"[{self.plugin_name}] Writing {len(pending)} rows for {day} failed, will retry: {e}")
+            self._merge_retry(day, pending)
+            return False
+
+    async def _flush_pending(self):
+        async with self._day_lock:
+            for day in sorted(self._retry):
+                await self._write_or_retry(day, self._retry.pop(day))
+            await self._write_or_retry(self.active_day, self._swap_pending())
+
+    async def _seal_unsealed_days(self):
+        """封存已切走的日期；该日仍有未落库的批次时先不封存"""
+        async with self._day_lock:
+            for day in sorted(self._unsealed_days):
+                if day in self._retry:
+                    await self._write_or_retry(day, self._retry.pop(day))
+                    if day in self._retry:
+                        continue
+                await asyncio.to_thread(self._seal_day, day)
+                self._unsealed_days.discard(day)
+
+    def _is_sealed(self, day: str) -> bool:
+        return not self._backfill_due and day not in self._unsealed_days
+
+    def _request_flush(self):
+        """缓冲接近上限时提前落库，不等待结果"""
+        if self._flush_task is None or self._flush_task.done():
+            self.ingest_stats["early_flushes"] += 1
+            self._flush_task = asyncio.create_task(self._flush_pending())
+
+    def get_ingest_status(self) -> dict:
+        return {
+            **self.ingest_stats,
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "sample_threshold": self.sample_threshold,
+            "sample_rate": self.sample_rate,
+        }
+
+    async def _rollover(self, new_day: str):
+        """切换记账日：先切换缓冲与日期，再落库并封存前一天"""
+        async with self._day_lock:
+            prev_day = self.active_day
+            if new_day <= prev_day:
+                return
+            # 这两步之间没有 await，切换对消息处理是原子的
+            pending = self._swap_pending()
+            self.active_day = new_day
+            self._unsealed_days.add(prev_day)
+            self._health_due = prev_day
+            await self._write_or_retry(prev_day, pending)
+        await self._seal_unsealed_days()
+
+    def _get_day_summary(self, gid, day: str):
+        """返回 (活跃人数, 消息数)，已封存的日期直接读汇总表"""
+        with sqlite3.connect(self.db) as conn:
+            sealed = conn.execute("SELECT 1 FROM sealed_days WHERE date=?", (day,)).fetchone()
+            if sealed:
+                row = conn.execute(
+                    "SELECT active_users, msg_count FROM daily_rollup WHERE group_id=? AND date=?",
+                    (gid, day),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT COUNT(DISTINCT user_id), SUM(msg_count) FROM activity WHERE group_id=? AND date=?",
+                    (gid, day),
+                ).fetchone()
+        active_users, total_msgs = row or (0, 0)
+        return active_users or 0, total_msgs or 0
+
+    def _load_health_windows(self, day: str) -> list:
+        base = datetime.strptime(day, "%Y-%m-%d")
+        d7, d14, d30 = ((base - timedelta(days=n)).strftime("%Y-%m-%d") for n in (7, 14, 30))
+        # 单次分组扫描，条件聚合得到各窗口的合计与群的统计天数（自首条汇总起）
+        with sqlite3.connect(self.db) as conn:
+            rows = conn.execute(
+                """
+                SELECT r.group_id,
+                       SUM(CASE WHEN r.date>:d7 THEN r.active_users ELSE 0 END),
+                       SUM(r.active_users),
+                       SUM(CASE WHEN r.date>:d7 THEN r.msg_count ELSE 0 END),
+                       SUM(r.msg_count),
+                       SUM(CASE WHEN r.date>:d14 AND r.date<=:d7 THEN r.msg_count ELSE 0 END),
+                       CAST(julianday(:day) - julianday(MIN(f.first_date)) AS INTEGER) + 1
+                FROM daily_rollup r
+                JOIN (SELECT group_id, MIN(date) AS first_date FROM daily_rollup GROUP BY group_id) f
+                  ON f.group_id = r.group_id
+                WHERE r.date>:d30 AND r.date<=:day
+                GROUP BY r.group_id
+                """,
+                {"d7": d7, "d14": d14, "d30": d30, "day": day},
+            ).fetchall()
+        return rows
+
+    def _save_health(self, records: list):
+        with sqlite3.connect(self.db) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO group_health(group_id,date,avg_users_7d,avg_users_30d,avg_msgs_7d,"
+                "avg_msgs_30d,member_count,activity_rate,wow_change,drop_alert,computed_at) "
+                "VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                records,
+            )
+
+    async def compute_group_health(self, day: str):
+        """基于 daily_rollup 一次性计算所有群截至 day 的健康度并入库"""
+        rows = await asyncio.to_thread(self._load_health_windows, day)
+        if not rows:
+            return
+
+        # 限制并发，避免日切时集中请求平台接口
+        semaphore = asyncio.Semaphore(HEALTH_MEMBER_FETCH_CONCURRENCY)
+
+        async def member_count(gid):
+            async with semaphore:
+                try:
+                    members = await self.context.get_group_member_list(gid)
+                    return len(members) if members else None
+                except Exception:
+                    return None
+
+        counts = await asyncio.gather(*(member_count(r[0]) for r in rows))
+        computed_at = datetime.now().isoformat(timespec="seconds")
+        records = []
+        for (gid, u7, u30, this_week, m30, last_week, age), members in zip(rows, counts):
+            # 历史不足一个窗口的群只按已有天数求均值，缺失的日期按 0 计
+            days_7, days_30 = min(7, age), min(30, age)
+            u7, u30 = u7 / days_7, u30 / days_30
+            m7, m30 = this_week / days_7, m30 / days_30
+            rate = u7 / members if members else None
+            # 上周不完整时不做周环比
+            wow = (this_week - last_week) / last_week if last_week and age >= 14 else None
+            alert = int(
+                wow is not None
+                and last_week >= HEALTH_MIN_WEEK_MSGS
+                and wow <= -self.health_drop_threshold
+            )
+            records.append((gid, day, u7, u30, m7, m30, members, rate, wow, alert, computed_at))
+        await asyncio.to_thread(self._save_health, records)
+        logger.info(f"[{self.plugin_name}] Computed health for {len(records)} groups on {day}.")
+
+    async def get_group_health(self, gid) -> dict:
+        """最近一次计算的群健康度，没有时返回 None"""
+        with sqlite3.connect(self.db) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                "SELECT * FROM group_health WHERE group_id=? ORDER BY date DESC LIMIT 1",
+                (gid,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def _format_health(self, health: dict) -> str:
+        if not health:
+            return ""
+        message = (
+            f"\n🩺 日均活跃：近7天 {health['avg_users_7d']:.1f} 人 / 近30天 {health['avg_users_30d']:.1f} 人"
+            + (f"（活跃率 {health['activity_rate']*100:.1f}%）" if health["activity_rate"] is not None else "")
+            + f"\n📈 日均消息：近7天 {health['avg_msgs_7d']:.1f} 条 / 近30天 {health['avg_msgs_30d']:.1f} 条"
+        )
+        if health["wow_change"] is not None:
+            message += f"\n📉 周环比：{health['wow_change']*100:+.1f}%"
+            if health["drop_alert"]:
+                message += " ⚠️ 活跃明显下降"
+        return message
+
+    def _get_day_breakdown(self, gid, day: str) -> dict:
+        """返回 day 的消息类型计数，已封存的日期直接读汇总表"""
+        with sqlite3.connect(self.db) as conn:
+            sealed = conn.execute("SELECT 1 FROM sealed_days WHERE date=?", (day,)).fetchone()
+            if sealed:
+                row = conn.execute(
+                    f"SELECT {','.join(TYPE_FIELDS)} FROM daily_rollup WHERE group_id=? AND date=?",
+                    (gid, day),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    f"SELECT {','.join(f'SUM({f})' for f in TYPE_FIELDS)} FROM activity WHERE group_id=? AND date=?",
+                    (gid, day),
+                ).fetchone()
+        return {f: v or 0 for f, v in zip(TYPE_FIELDS, row or (0,) * len(TYPE_FIELDS))}
+
+    def _format_breakdown(self, gid, day: str) -> str:
+        if not self.type_breakdown:
+            return ""
+        b = self._get_day_breakdown(gid, day)
+        return (
+            f"\n📝 文字 {b['text_msgs']}｜🖼️ 图片 {b['image_msgs']}｜😀 表情 {b['face_msgs']}"
+            f"｜↩️ 回复 {b['reply_msgs']}｜@ {b['at_msgs']}｜🔤 字数 {b['char_count']}"
+        )
+
+    async def get_group_stats(self, gid, day: str = None) -> dict:
+        """群聊某日的统计，默认当天"""
+        await self._flush_pending()
+        day = day or self.active_day
+        active_users, total_msgs = self._get_day_summary(gid, day)
+        stats = {
+            "group_id": gid,
+            "date": day,
+            "active_count": active_users,
+            "message_count": total_msgs,
+        }
+        if self.type_breakdown:
+            stats["type_breakdown"] = self._get_day_breakdown(gid, day)
+        return stats
+
+    async def get_user_stats(self, gid, uid) -> dict:
+        """单个用户在某群的今日消息、排名、连续天数与近30天活跃"""
+        await self._flush_pending()
+        today = self.active_day
+        since = (datetime.strptime(today, "%Y-%m-%d") - timedelta(days=29)).strftime("%Y-%m-%d")
+        with sqlite3.connect(self.db) as conn:
+            row = conn.execute(
+                "SELECT msg_count FROM activity WHERE group_id=? AND user_id=? AND date=?",
+                (gid, uid, today),
+            ).fetchone()
+            today_msgs = row[0] if row else 0
+            rank = None
+            if today_msgs:
+                rank = conn.execute(
+                    "SELECT COUNT(*)+1 FROM activity WHERE group_id=? AND date=? AND msg_count>?",
+                    (gid, today, today_msgs),
+                ).fetchone()[0]
+            days_30, msgs_30 = conn.execute(
+                "SELECT COUNT(*), SUM(msg_count) FROM activity WHERE user_id=? AND group_id=? AND date>=?",
+                (uid, gid, since),
+            ).fetchone()
+            row = conn.execute(
+                "SELECT last_date, streak, best_streak, total_msgs FROM user_streak WHERE user_id=? AND group_id=?",
+                (uid, gid),
+            ).fetchone()
+        last_date, streak, best_streak, total_msgs = row or (None, 0, 0, 0)
+        # 昨天和今天都没发言则连续记录已中断
+        if last_date not in (today, self._prev_day(today)):
+            streak = 0
+        return {
+            "group_id": gid,
+            "user_id": uid,
+            "date": today,
+            "today_msgs": today_msgs,
+            "today_rank": rank,
+            "streak": streak,
+            "best_streak": best_streak,
+            "active_days_30d": days_30,
+            "msgs_30d": msgs_30 or 0,
+            "total_msgs": total_msgs,
+        }
+
+    async def get_user_overview(self, uid) -> dict:
+        """同一用户在所有群的汇总"""
+        await self._flush_pending()
+        today = self.active_day
+        with sqlite3.connect(self.db) as conn:
+            groups, total_msgs, last_date = conn.execute(
+                "SELECT COUNT(*), SUM(total_msgs), MAX(last_date) FROM user_streak WHERE user_id=?",
+                (uid,),
+            ).fetchone()
+            today_msgs = conn.execute(
+                "SELECT SUM(msg_count) FROM activity WHERE user_id=? AND date=?",
+                (uid, today),
+            ).fetchone()[0]
+        return {
+            "user_id": uid,
+            "date": today,
+            "groups": groups,
+            "today_msgs": today_msgs or 0,
+            "total_msgs": total_msgs or 0,
+            "last_active": last_date,
+        }
+
+    @filter.event_message_type(filter.EventMessageType.GROUP_MESSAGE)
+    async def on_group_msg(self, event: AstrMessageEvent):
+        gid = event.message_obj.group_id
+        uid = event.get_sender_id()
+        # 只写内存缓冲，由调度任务批量落库到 active_day；任何情况下都不等待
+        stats = self.ingest_stats
+        stats["received"] += 1
+        key = (gid, uid)
+        counts = self._pending.get(key)
+        if counts is None:
+            if len(self._pending) >= self.max_pending:
+                stats["dropped"] += 1
+                self._request_flush()
+                return
+            counts = self._pending[key] = [0] * (1 + len(TYPE_FIELDS)) if self.type_breakdown else [0]
+            if len(self._pending) >= self.max_pending // 2:
+                self._request_flush()
+        counts[0] += 1
+        if self.type_breakdown:
+            if len(counts) == 1:
+                # 运行中开启类型统计，补齐本周期已缓冲的条目
+                counts.extend([0] * len(TYPE_FIELDS))
+            n = self._group_window.get(gid, 0) + 1
+            self._group_window[gid] = n
+            if n <= self.sample_threshold:
+                self._classify(event.get_messages(), counts)
+            elif n % self.sample_rate == 0:
+                # 刷屏时抽样统计类型，按抽样率放大；msg_count 始终精确
+                self._classify(event.get_messages(), counts, self.sample_rate)
+            else:
+                stats["sampled_out"] += 1
+
+    @staticmethod
+    def _classify(chain, counts, weight: int = 1):
+        """单次遍历消息链，按类型累加到 counts（每类每条消息最多计 1 次）"""
+        seen = set()
+        chars = 0
+        for comp in chain:
+            slot = COMPONENT_SLOTS.get(type(comp))
+            if slot is None:
+                continue
+            seen.add(slot)
+            if slot == TEXT_SLOT:
+                chars += len(comp.text)
+        for slot in seen:
+            counts[slot] += weight
+        counts[CHAR_SLOT] += chars * weight
 
     @filter.command("昨日活跃")
     async def yestoday_stats(self, event: AstrMessageEvent):
         gid = event.message_obj.group_id
-        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-        with sqlite3.connect(self.db) as conn:
-            cur = conn.execute(
-                "SELECT COUNT(DISTINCT user_id), SUM(msg_count) FROM activity WHERE group_id=? AND date=?",
-                (gid, yesterday),
-            )
-            active_users, total_msgs = cur.fetchone() or (0, 0)
+        yesterday = self._prev_day(self.active_day)
+        active_users, total_msgs = self._get_day_summary(gid, yesterday)
         members = await self.context.get_group_member_list(gid)
         total = len(members) if members else "未知"
         message = (
@@ -78,19 +649,17 @@ class GroupStatsPlugin(Star):
             f"🔥 活跃：{active_users} 人\n"
             f"💬 消息：{total_msgs} 条"
             + (f"  📈 活跃率：{active_users/total*100:.1f}%" if total != "未知" else "")
+            + self._format_breakdown(gid, yesterday)
+            + self._format_health(await self.get_group_health(gid))
         )
         await event.send(message)
 
     @filter.command("今日统计")
     async def today_stats(self, event: AstrMessageEvent):
         gid = event.message_obj.group_id
-        today = datetime.now().strftime("%Y-%m-%d")
-        with sqlite3.connect(self.db) as conn:
-            cur = conn.execute(
-                "SELECT COUNT(DISTINCT user_id), SUM(msg_count) FROM activity WHERE group_id=? AND date=?",
-                (gid, today),
-            )
-            active_users, total_msgs = cur.fetchone() or (0, 0)
+        await self._flush_pending()
+        today = self.active_day
+        active_users, total_msgs = self._get_day_summary(gid, today)
         members = await self.context.get_group_member_list(gid)
         total = len(members) if members else "未知"
         message = (
@@ -99,7 +668,25 @@ class GroupStatsPlugin(Star):
             f"🔥 已活跃：{active_users} 人\n"
             f"💬 消息：{total_msgs} 条"
             + (f"  📈 活跃率：{active_users/total*100:.1f}%" if total != "未知" else "")
+            + self._format_breakdown(gid, today)
+        )
+        await event.send(message)
+
+    @filter.command("我的活跃")
+    async def my_stats(self, event: AstrMessageEvent):
+        gid = event.message_obj.group_id
+        uid = event.get_sender_id()
+        stats = await self.get_user_stats(gid, uid)
+        overview = await self.get_user_overview(uid)
+        message = (
+            f"🙋 我的活跃（{stats['date']}）\n"
+            f"💬 今日消息：{stats['today_msgs']} 条"
+            + (f"  🏅 排名：第{stats['today_rank']}名" if stats["today_rank"] else "")
+            + f"\n🔥 连续活跃：{stats['streak']} 天（最长 {stats['best_streak']} 天）\n"
+            f"📅 近30天：活跃 {stats['active_days_30d']} 天，消息 {stats['msgs_30d']} 条"
         )
+        if overview["groups"] > 1:
+            message += f"\n🌐 全部 {overview['groups']} 个群：今日 {overview['today_msgs']} 条，累计 {overview['total_msgs']} 条"
         await event.send(message)
 
     @filter.command("在线人数")
@@ -110,23 +697,53 @@ class GroupStatsPlugin(Star):
         await event.send(f"👥 当前群聊成员总数：{total}人")
 
     async def scheduler(self):
+        last_flush = time.monotonic()
         while True:
-            now = datetime.now()
-            if now.strftime("%H:%M") == self.push_time and now.second == 0:
-                await self.daily_push()
+            try:
+                now = datetime.now()
+                today = now.strftime("%Y-%m-%d")
+                if self._backfill_due:
+                    await asyncio.to_thread(self._seal_days_before, self.active_day)
+                    self._backfill_due = False
+                if today != self.active_day:
+                    await self._rollover(today)
+                    last_flush = time.monotonic()
+                elif time.monotonic() - last_flush >= FLUSH_INTERVAL:
+                    await self._flush_pending()
+                    last_flush = time.monotonic()
+                if self._unsealed_days:
+                    await self._seal_unsealed_days()
+                # 先封存前一天并计算健康度，再允许推送
+                if self._health_due and self._is_sealed(self._health_due):
+                    await self.compute_group_health(self._health_due)
+                    self._health_due = None
+                if now.strftime("%H:%M") == self.push_time and self._last_push_date != today:
+                    self._last_push_date = today
+                    self._push_due = True
+                if self._push_due and self._is_sealed(self._prev_day(self.active_day)):
+                    self._push_due = False
+                    await self.daily_push()
+            except Exception as e:
+                logger.error(f"[{self.plugin_name}] Scheduler error: {e}")
             await asyncio.sleep(1)  # 每秒检查一次，避免高CPU
 
+    async def terminate(self):
+        # 先停掉调度任务，避免重载或停用后旧实例继续日切、推送
+        self._scheduler_task.cancel()
+        try:
+            await self._scheduler_task
+        except asyncio.CancelledError:
+            pass
+        if self._flush_task and not self._flush_task.done():
+            await self._flush_task
+        await self._flush_pending()
+
     async def daily_push(self):
-        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        yesterday = self._prev_day(self.active_day)
         groups = self.target_groups if self.target_groups else []  # 如果为空，推送所有群？或留空不推
         for gid in groups:
             try:
-                with sqlite3.connect(self.db) as conn:
-                    cur = conn.execute(
-                        "SELECT COUNT(DISTINCT user_id), SUM(msg_count) FROM activity WHERE group_id=? AND date=?",
-                        (gid, yesterday),
-                    )
-                    active_users, total_msgs = cur.fetchone() or (0, 0)
+                active_users, total_msgs = self._get_day_summary(gid, yesterday)
                 members = await self.context.get_group_member_list(gid)
                 total = len(members) if members else "未知"
                 message = (
@@ -135,6 +752,8 @@ class GroupStatsPlugin(Star):
                     f"🔥 活跃：{active_users} 人\n"
                     f"💬 消息：{total_msgs} 条"
                     + (f"  📈 活跃率：{active_users/total*100:.1f}%" if total != "未知" else "")
+                    + self._format_breakdown(gid, yesterday)
+                    + self._format_health(await self.get_group_health(gid))
                 )
                 # 假设API为send_group_message(gid, message)，如果不对，请替换为实际API（如self.context.message_sender.send_group(gid, message)）
                 await self.context.send_group_message(gid, message)
@@ -3,6 +3,7 @@ Web配置API接口
 提供插件配置的HTTP接口
 """
 import json
+from datetime import datetime
 from typing import Dict, Any
 from astrbot.api import logger
 
@@ -41,6 +42,14 @@ class WebAPI:
                 return await self.get_status()
             elif path == "/api/groups" and method == "GET":
                 return await self.get_groups()
+            elif path.startswith("/api/user-stats/") and method == "GET":
+                parts = path[len("/api/user-stats/"):].strip("/").split("/")
+                if len(parts) == 2:
+                    return await self.get_user_stats(parts[0], parts[1])
+                return await self.get_user_overview(parts[0])
+            elif path.startswith("/api/health/") and method == "GET":
+                group_id = path.split("/")[-1]
+                return await self.get_group_health(group_id)
             elif path.startswith("/api/stats/") and method == "GET":
                 group_id = path.split("/")[-1]
                 return await self.get_group_stats(group_id)
@@ -71,7 +80,12 @@ class WebAPI:
                 "enable_online_monitor": config.get("enable_online_monitor", True),
                 "enable_activity_summary": config.get("enable_activity_summary", True),
                 "activity_time_window": config.get("activity_time_window", 24),
-                "min_active_messages": config.get("min_active_messages", 3)
+                "min_active_messages": config.get("min_active_messages", 3),
+                "enable_type_breakdown": config.get("enable_type_breakdown", True),
+                "health_drop_threshold": config.get("health_drop_threshold", 0.3),
+                "ingest_max_pending": config.get("ingest_max_pending", 10000),
+                "ingest_sample_threshold": config.get("ingest_sample_threshold", 200),
+                "ingest_sample_rate": config.get("ingest_sample_rate", 10)
             }
         }
     
@@ -86,6 +100,11 @@ class WebAPI:
                 self.plugin.config.update(validated)
             else:
                 self.plugin.config = validated
+            self.plugin.type_breakdown = validated["enable_type_breakdown"]
+            self.plugin.health_drop_threshold = validated["health_drop_threshold"]
+            self.plugin.max_pending = validated["ingest_max_pending"]
+            self.plugin.sample_threshold = validated["ingest_sample_threshold"]
+            self.plugin.sample_rate = validated["ingest_sample_rate"]
             
             # 重新调度任务
             if hasattr(self.plugin, 'scheduler') and self.plugin.scheduler:
@@ -119,6 +138,10 @@ class WebAPI:
             "send_time": config.get("send_time", "09:00")
         }
         
+        # 消息写入缓冲与过载统计
+        if hasattr(self.plugin, 'get_ingest_status'):
+            status["ingest"] = self.plugin.get_ingest_status()
+        
         # 获取下次执行时间
         if hasattr(self.plugin, 'scheduler') and self.plugin.scheduler:
             jobs = self.plugin.scheduler.get_jobs()
@@ -151,27 +174,41 @@ class WebAPI:
     async def get_group_stats(self, group_id: str) -> Dict[str, Any]:
         """获取群聊统计"""
         try:
-            # 获取在线人数
-            online_count = await self.plugin._get_online_count(group_id)
-            
-            # 获取活跃度
-            active_count, active_members = await self.plugin._get_activity_summary(
-                group_id, hours=24, min_messages=3
-            )
-            
-            stats = {
-                "group_id": group_id,
-                "online_count": online_count,
-                "active_count_24h": active_count,
-                "active_members": active_members[:10],  # 前10名
-                "timestamp": "2026-01-14T13:41:56"  # 示例时间
-            }
+            # 当日活跃人数、消息数及消息类型分布（启用时）
+            stats = await self.plugin.get_group_stats(group_id)
+            stats["timestamp"] = datetime.now().isoformat(timespec="seconds")
             
             return {"success": True, "data": stats}
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    async def get_group_health(self, group_id: str) -> Dict[str, Any]:
+        """获取群聊健康度"""
+        try:
+            health = await self.plugin.get_group_health(group_id)
+            if health is None:
+                return {"success": False, "error": "暂无健康度数据"}
+            return {"success": True, "data": health}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def get_user_stats(self, group_id: str, user_id: str) -> Dict[str, Any]:
+        """获取成员在指定群的活跃统计"""
+        try:
+            stats = await self.plugin.get_user_stats(group_id, user_id)
+            return {"success": True, "data": stats}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def get_user_overview(self, user_id: str) -> Dict[str, Any]:
+        """获取成员的跨群活跃汇总"""
+        try:
+            overview = await self.plugin.get_user_overview(user_id)
+            return {"success": True, "data": overview}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
     async def force_report(self) -> Dict[str, Any]:
         """强制执行报告"""
         try:
@@ -229,9 +266,14 @@ class WebAPI:
         # 验证布尔值
         validated["enable_online_monitor"] = bool(config.get("enable_online_monitor", True))
         validated["enable_activity_summary"] = bool(config.get("enable_activity_summary", True))
+        validated["enable_type_breakdown"] = bool(config.get("enable_type_breakdown", True))
         
         # 验证数值
         validated["activity_time_window"] = max(1, int(config.get("activity_time_window", 24)))
         validated["min_active_messages"] = max(1, int(config.get("min_active_messages", 3)))
+        validated["health_drop_threshold"] = min(1.0, max(0.0, float(config.get("health_drop_threshold", 0.3))))
+        validated["ingest_max_pending"] = max(100, int(config.get("ingest_max_pending", 10000)))
+        validated["ingest_sample_threshold"] = max(1, int(config.get("ingest_sample_threshold", 200)))
+        validated["ingest_sample_rate"] = max(1, int(config.get("ingest_sample_rate", 10)))
         
         return validated
\ No newline at end of file
@@ -46,6 +46,9 @@ class WebRoutes:
         self.router.add_api_route("/api/status", self.get_status, methods=["GET"])
         self.router.add_api_route("/api/groups", self.get_groups, methods=["GET"])
         self.router.add_api_route("/api/stats/{group_id}", self.get_group_stats, methods=["GET"])
+        self.router.add_api_route("/api/health/{group_id}", self.get_group_health, methods=["GET"])
+        self.router.add_api_route("/api/user-stats/{group_id}/{user_id}", self.get_user_stats, methods=["GET"])
+        self.router.add_api_route("/api/user-stats/{user_id}", self.get_user_overview, methods=["GET"])
         self.router.add_api_route("/api/force-report", self.force_report, methods=["POST"])
         self.router.add_api_route("/api/test-message", self.test_message, methods=["POST"])
     
@@ -97,7 +100,12 @@ class WebRoutes:
                     "enable_activity_summary": config.get("enable_activity_summary", True),
                     "activity_time_window": config.get("activity_time_window", 24),
                     "min_active_messages": config.get("min_active_messages", 3),
-                    "data_retention_days": config.get("data_retention_days", 30)
+                    "data_retention_days": config.get("data_retention_days", 30),
+                    "enable_type_breakdown": config.get("enable_type_breakdown", True),
+                    "health_drop_threshold": config.get("health_drop_threshold", 0.3),
+                    "ingest_max_pending": config.get("ingest_max_pending", 10000),
+                    "ingest_sample_threshold": config.get("ingest_sample_threshold", 200),
+                    "ingest_sample_rate": config.get("ingest_sample_rate", 10)
                 }
             })
             
@@ -130,6 +138,11 @@ class WebRoutes:
                 self.plugin.config.update(validated_config)
             else:
                 self.plugin.config = validated_config
+            self.plugin.type_breakdown = validated_config["enable_type_breakdown"]
+            self.plugin.health_drop_threshold = validated_config["health_drop_threshold"]
+            self.plugin.max_pending = validated_config["ingest_max_pending"]
+            self.plugin.sample_threshold = validated_config["ingest_sample_threshold"]
+            self.plugin.sample_rate = validated_config["ingest_sample_rate"]
             
             # 如果调度器存在，更新配置
             if hasattr(self.plugin, 'report_scheduler') and self.plugin.report_scheduler:
@@ -166,6 +179,10 @@ class WebRoutes:
                 "database_path": self.plugin.db_manager.db.storage.path if hasattr(self.plugin, 'db_manager') else None
             }
             
+            # 消息写入缓冲与过载统计
+            if hasattr(self.plugin, 'get_ingest_status'):
+                status["ingest"] = self.plugin.get_ingest_status()
+            
             # 获取调度器状态
             if hasattr(self.plugin, 'report_scheduler') and self.plugin.report_scheduler:
                 scheduler_status = await self.plugin.report_scheduler.get_job_status()
@@ -223,22 +240,98 @@ class WebRoutes:
             JSON响应
         """
         try:
-            # 获取监控器实例
-            if hasattr(self.plugin, 'monitor'):
-                stats = await self.plugin.monitor.get_group_summary(group_id)
-                
-                return JSONResponse({
-                    "success": True,
-                    "data": stats
-                })
-            else:
+            # 当日活跃人数、消息数及消息类型分布（启用时）
+            stats = await self.plugin.get_group_stats(group_id)
+            
+            return JSONResponse({
+                "success": True,
+                "data": stats
+            })
+            
+        except Exception as e:
+            logger.error(f"获取群聊统计失败: {e}")
+            return JSONResponse({
+                "success": False,
+                "error": str(e)
+            }, status_code=500)
+    
+    async def get_group_health(self, group_id: str):
+        """
+        获取群聊健康度
+        
+        Args:
+            group_id: 群聊ID
+            
+        Returns:
+            JSON响应
+        """
+        try:
+            health = await self.plugin.get_group_health(group_id)
+            
+            if health is None:
                 return JSONResponse({
                     "success": False,
-                    "error": "监控器未初始化"
+                    "error": "暂无健康度数据"
                 }, status_code=404)
             
+            return JSONResponse({
+                "success": True,
+                "data": health
+            })
+            
         except Exception as e:
-            logger.error(f"获取群聊统计失败: {e}")
+            logger.error(f"获取群聊健康度失败: {e}")
+            return JSONResponse({
+                "success": False,
+                "error": str(e)
+            }, status_code=500)
+    
+    async def get_user_stats(self, group_id: str, user_id: str):
+        """
+        获取成员在指定群的活跃统计
+        
+        Args:
+            group_id: 群聊ID
+            user_id: 用户ID
+            
+        Returns:
+            JSON响应
+        """
+        try:
+            stats = await self.plugin.get_user_stats(group_id, user_id)
+            
+            return JSONResponse({
+                "success": True,
+                "data": stats
+            })
+            
+        except Exception as e:
+            logger.error(f"获取成员统计失败: {e}")
+            return JSONResponse({
+                "success": False,
+                "error": str(e)
+            }, status_code=500)
+    
+    async def get_user_overview(self, user_id: str):
+        """
+        获取成员的跨群活跃汇总
+        
+        Args:
+            user_id: 用户ID
+            
+        Returns:
+            JSON响应
+        """
+        try:
+            overview = await self.plugin.get_user_overview(user_id)
+            
+            return JSONResponse({
+                "success": True,
+                "data": overview
+            })
+            
+        except Exception as e:
+            logger.error(f"获取成员跨群汇总失败: {e}")
             return JSONResponse({
                 "success": False,
                 "error": str(e)
@@ -362,11 +455,16 @@ class WebRoutes:
         # 验证布尔值配置
         validated["enable_online_monitor"] = bool(config.get("enable_online_monitor", True))
         validated["enable_activity_summary"] = bool(config.get("enable_activity_summary", True))
+        validated["enable_type_breakdown"] = bool(config.get("enable_type_breakdown", True))
         
         # 验证数值配置
         validated["activity_time_window"] = max(1, int(config.get("activity_time_window", 24)))
         validated["min_active_messages"] = max(1, int(config.get("min_active_messages", 3)))
         validated["data_retention_days"] = max(1, int(config.get("data_retention_days", 30)))
+        validated["health_drop_threshold"] = min(1.0, max(0.0, float(config.get("health_drop_threshold", 0.3))))
+        validated["ingest_max_pending"] = max(100, int(config.get("ingest_max_pending", 10000)))
+        validated["ingest_sample_threshold"] = max(1, int(config.get("ingest_sample_threshold", 200)))
+        validated["ingest_sample_rate"] = max(1, int(config.get("ingest_sample_rate", 10)))
         
         return validated
 